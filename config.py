@@ -16,9 +16,9 @@ TOWN_CODE_URL = f"{BASE_URL}/bizcommon/selectbox/selectbox_townCodeJson.json"
 DOWNLOAD_DIR = "election_results"
 MAX_RETRIES = 3
 RETRY_DELAY = 2  # seconds
-BASE_DELAY = 1  # seconds between requests
-CITY_DELAY = 2  # seconds between cities
-CHUNK_SIZE = 8192
+BASE_DELAY = 1  # minimum seconds between report download starts, per worker
+CHUNK_SIZE = 1024 * 1024  # copy buffer for streamed downloads
+SNIFF_SIZE = 4096  # bytes inspected to detect the content type
 
 # Request settings
 TIMEOUT = 30  # seconds
@@ -6,7 +6,11 @@ This script aggregates CSV election data from voting district level (투표구)
 to higher administrative levels: sido (시도), sigungu (시군구), and eupmyeondong (읍면동).
 """
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 import argparse
 import logging
 from pathlib import Path
@@ -16,50 +20,86 @@ from typing import Dict, List, Optional
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def _write_csv(data: pd.DataFrame, filepath: Path):
+    """
+    Write a dataframe as UTF-8 CSV with a BOM using the Arrow CSV writer.
+    
+    Categorical columns are written from their dictionary, so each distinct
+    name is encoded once rather than per row.
+    
+    Args:
+        data (pd.DataFrame): Data to write
+        filepath (Path): Output file path
+    """
+    table = pa.Table.from_pandas(data, preserve_index=False)
+    with open(filepath, 'wb') as f:
+        # Keep the BOM so Excel detects UTF-8 for the Korean names
+        f.write('\ufeff'.encode('utf-8'))
+        pacsv.write_csv(table, f)
+
 class ElectionDataAggregator:
     """Aggregates Korean election data by administrative levels."""
     
-    def __init__(self, input_file: str):
+    def __init__(self, input_file: str, chunksize: Optional[int] = None):
         """
-        Initialize the aggregator with input CSV file.
+        Initialize the aggregator with input CSV or Parquet file.
         
         Args:
-            input_file (str): Path to the input CSV file
+            input_file (str): Path to the input file (read as Parquet if it ends
+                with .parquet, otherwise as CSV)
+            chunksize (Optional[int]): If set, read the file in chunks of this many
+                rows and keep only per-eupmyeondong totals in memory
         """
         self.input_file = Path(input_file)
+        self.chunksize = chunksize
         self.df = None
         self.numeric_columns = []
+        # Columns found to hold text, never aggregated
+        self._text_columns = set()
         self.admin_columns = ['시도명', '시군구명', '읍면동명']
+        self._aggregated = None
         
     def load_data(self) -> pd.DataFrame:
-        """Load and validate the CSV data."""
+        """
+        Load and validate the CSV data.
+        
+        When a chunksize is set, each chunk is collapsed to one row per
+        (시도명, 시군구명, 읍면동명) as it is read, so peak memory is bounded by
+        the chunk size instead of the file size. Since all aggregations are
+        sums, the results are the same as for the full data.
+        """
         try:
             logger.info(f"Loading data from {self.input_file}")
-            self.df = pd.read_csv(self.input_file)
-            logger.info(f"Loaded {len(self.df)} rows")
+            self.numeric_columns = []
+            self._text_columns = set()
+            self._aggregated = None
             
-            # Validate required columns exist
-            required_columns = ['시도명', '시군구명', '읍면동명']
-            missing_columns = [col for col in required_columns if col not in self.df.columns]
+            if self.chunksize:
+                self.df = self._read_compacted()
+            elif self._is_parquet():
+                self.df = self._prepare_frame(pd.read_parquet(self.input_file))
+            else:
+                self.df = self._prepare_frame(pd.read_csv(self.input_file))
+                logger.info(f"Loaded {len(self.df)} rows")
             
-            if missing_columns:
-                raise ValueError(f"Missing required columns: {missing_columns}")
+            # Store counts as int32 where they fit, halving the memory scanned by
+            # the sums; _aggregate_sorted accumulates them in int64
+            int32_info = np.iinfo(np.int32)
+            narrow_columns = [col for col in self.numeric_columns
+                              if pd.api.types.is_integer_dtype(self.df[col])
+                              and self.df[col].min() >= int32_info.min
+                              and self.df[col].max() <= int32_info.max]
+            if narrow_columns:
+                self.df[narrow_columns] = self.df[narrow_columns].astype(np.int32)
             
-            # Identify numeric columns to aggregate (exclude administrative columns and 투표구명)
-            exclude_columns = ['시도명', '시군구명', '읍면동명', '투표구명']
-            self.numeric_columns = [col for col in self.df.columns 
-                                  if col not in exclude_columns and 
-                                  pd.api.types.is_numeric_dtype(self.df[col]) or
-                                  self._is_numeric_string_column(col)]
+            # Sort once by the administrative hierarchy so that every group at
+            # every level is a contiguous run of rows (see _aggregate_sorted)
+            self.df.sort_values(self.admin_columns, kind='mergesort', inplace=True, ignore_index=True)
             
-            logger.info(f"Identified numeric columns for aggregation: {self.numeric_columns}")
-            
-            # Convert numeric string columns to numeric
-            for col in self.numeric_columns:
-                if self.df[col].dtype == 'object':
-                    # Handle comma-separated numbers (Korean number format)
-                    self.df[col] = self.df[col].astype(str).str.replace(',', '').str.replace('', '0')
-                    self.df[col] = pd.to_numeric(self.df[col], errors='coerce').fillna(0)
+            # Low-cardinality names as categoricals, so group boundaries are
+            # found by comparing small integer codes rather than strings
+            for col in self.admin_columns:
+                self.df[col] = self.df[col].astype('category')
             
             return self.df
             
@@ -67,37 +107,214 @@ class ElectionDataAggregator:
             logger.error(f"Error loading data: {e}")
             raise
     
-    def _is_numeric_string_column(self, column: str) -> bool:
-        """Check if a column contains numeric data stored as strings."""
-        if self.df[column].dtype != 'object':
-            return False
-        
-        # Sample a few values to check if they're numeric
-        sample_values = self.df[column].dropna().head(10)
-        for value in sample_values:
-            try:
-                # Try to convert after removing commas
-                float(str(value).replace(',', ''))
-            except (ValueError, TypeError):
-                return False
-        return True
+    def _is_parquet(self) -> bool:
+        """Check whether the input file is a Parquet file."""
+        return self.input_file.suffix == '.parquet'
+    
+    def _iter_chunks(self):
+        """Yield the input file as dataframes of at most chunksize rows."""
+        if self._is_parquet():
+            for batch in pq.ParquetFile(self.input_file).iter_batches(batch_size=self.chunksize):
+                yield batch.to_pandas()
+        else:
+            # Read every column as text so that each chunk goes through the same
+            # numeric conversion, rather than depending on per-chunk type inference
+            yield from pd.read_csv(self.input_file, chunksize=self.chunksize, dtype=str)
+    
+    def _read_compacted(self) -> pd.DataFrame:
+        """Read the input in chunks, keeping only per-eupmyeondong totals."""
+        partials = []
+        total_rows = 0
+        
+        for chunk in self._iter_chunks():
+            chunk = self._prepare_frame(chunk)
+            total_rows += len(chunk)
+            # Missing names are kept as their own groups so that the roll-up
+            # in aggregate_all_levels sees the same rows as the full data
+            # observed=True keeps categorical names (as read from Parquet) from
+            # expanding into every combination of categories
+            partials.append(chunk.groupby(self.admin_columns, dropna=False, sort=False, observed=True)
+                            [self.numeric_columns].sum())
+        
+        if not partials:
+            raise ValueError(f"No data found in {self.input_file}")
+        
+        # A column first found numeric in a later chunk is missing from the
+        # earlier partials; the sum counts those as 0, and integer columns
+        # get their type back afterwards
+        integer_columns = {}
+        for partial in partials:
+            for col, dtype in partial.dtypes.items():
+                if pd.api.types.is_integer_dtype(dtype):
+                    integer_columns.setdefault(col, dtype)
+        compacted = (pd.concat(partials)
+                     .groupby(level=self.admin_columns, dropna=False, sort=False, observed=True)
+                     [self.numeric_columns].sum()
+                     .astype(integer_columns)
+                     .reset_index())
+        logger.info(f"Loaded {total_rows} rows in chunks of {self.chunksize}, "
+                    f"compacted to {len(compacted)} eupmyeondong rows")
+        return compacted
     
-    def aggregate_by_sido(self) -> pd.DataFrame:
-        """Aggregate data by sido (시도) level."""
+    def _prepare_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Validate columns and convert numeric string columns of a loaded frame."""
+        # Validate required columns exist
+        required_columns = ['시도명', '시군구명', '읍면동명']
+        missing_columns = [col for col in required_columns if col not in df.columns]
+        
+        if missing_columns:
+            raise ValueError(f"Missing required columns: {missing_columns}")
+        
+        # Identify numeric columns to aggregate
+        self._update_numeric_columns(df)
+        
+        # Convert numeric string columns to numeric
+        string_columns = [col for col in self.numeric_columns
+                          if not pd.api.types.is_numeric_dtype(df[col])]
+        if string_columns:
+            # Handle comma-separated numbers (Korean number format) and
+            # treat empty cells and '-' placeholders as 0
+            converted = (
+                df[string_columns]
+                .apply(lambda s: s.astype('string').str.replace(',', '', regex=False))
+                .apply(lambda s: s.mask(s.isin(['', '-']), '0'))
+                .apply(pd.to_numeric, errors='coerce')
+                .fillna(0)
+            )
+            
+            # Keep whole-number columns (vote counts) as integers
+            integer_columns = [col for col in string_columns if (converted[col] % 1 == 0).all()]
+            converted[integer_columns] = converted[integer_columns].astype(np.int64)
+            df[string_columns] = converted
+        
+        # Missing values in float columns count as 0, as groupby().sum() skipped them
+        float_columns = [col for col in self.numeric_columns if pd.api.types.is_float_dtype(df[col])]
+        if float_columns:
+            df[float_columns] = df[float_columns].fillna(0)
+        
+        return df
+    
+    def _update_numeric_columns(self, df: pd.DataFrame):
+        """
+        Classify the columns of a loaded frame or chunk not classified yet.
+        
+        The full read and chunked reads share this rule, whatever types the
+        reader produced: a column is numeric when it has at least one value and
+        its non-empty values are numbers. Columns without any value yet stay
+        unclassified, so a later chunk can settle them.
+        """
+        # Administrative columns and 투표구명 are never aggregated
+        exclude_columns = ['시도명', '시군구명', '읍면동명', '투표구명']
+        found = []
+        for col in df.columns:
+            if col in exclude_columns or col in self.numeric_columns or col in self._text_columns:
+                continue
+            is_numeric = self._probe_numeric(df[col])
+            if is_numeric:
+                found.append(col)
+            elif is_numeric is not None:
+                self._text_columns.add(col)
+        
+        if found:
+            # Keep the file's column order
+            numeric = set(self.numeric_columns).union(found)
+            self.numeric_columns = [col for col in df.columns if col in numeric]
+            logger.info(f"Identified numeric columns for aggregation: {self.numeric_columns}")
+    
+    @staticmethod
+    def _probe_numeric(series: pd.Series, sample_size: int = 64,
+                       block_size: int = 4096) -> Optional[bool]:
+        """
+        Check whether a column holds numbers, possibly stored as strings.
+        
+        Returns:
+            Optional[bool]: None if the column has no non-empty values
+        """
+        if pd.api.types.is_numeric_dtype(series):
+            return True if series.notna().any() else None
+        
+        # Collect the first non-empty values block by block, so a long column
+        # is not converted in full just to be probed; empty cells and '-'
+        # placeholders are skipped since they are converted to 0
+        sample = []
+        for start in range(0, len(series), block_size):
+            block = series.iloc[start:start + block_size]
+            block = block[block.notna() & ~block.isin(['', '-'])]
+            sample.extend(block.head(sample_size - len(sample)).tolist())
+            if len(sample) >= sample_size:
+                break
+        
+        # Require at least one number so all-empty text columns are not
+        # summed as 0
+        if not sample:
+            return None
+        values = pd.Series(sample, dtype='string').str.replace(',', '', regex=False)
+        return bool(pd.to_numeric(values, errors='coerce').notna().all())
+    
+    def _aggregate_sorted(self, keys: List[str], source: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """
+        Sum numeric columns over contiguous runs of equal key values.
+        
+        Relies on the data being sorted by the administrative hierarchy in
+        load_data, so each group is one run of rows that can be summed with
+        np.add.reduceat instead of building a hash table.
+        
+        Args:
+            keys (List[str]): Administrative columns to group by
+            source (Optional[pd.DataFrame]): Finer-level aggregation to roll up
+                instead of the loaded data (must be sorted by keys)
+            
+        Returns:
+            pd.DataFrame: One row per group, sorted by keys
+        """
+        if source is None:
+            source = self.df
+        
+        # Rows with missing keys are dropped, as groupby does by default
+        valid = source[keys].notna().all(axis=1)
+        df = source if valid.all() else source[valid]
+        
+        if df.empty:
+            return pd.DataFrame(columns=keys + self.numeric_columns)
+        
+        if all(isinstance(df[key].dtype, pd.CategoricalDtype) for key in keys):
+            key_values = np.column_stack([df[key].cat.codes.to_numpy() for key in keys])
+        else:
+            key_values = df[keys].to_numpy()
+        offsets = np.flatnonzero(np.r_[True, (key_values[1:] != key_values[:-1]).any(axis=1)])
+        
+        data = {key: df[key].iloc[offsets].reset_index(drop=True) for key in keys}
+        
+        # Sum all integer columns in a single 2-D reduction, widened to int64
+        # so totals cannot overflow int32
+        integer_columns = [col for col in self.numeric_columns
+                           if pd.api.types.is_integer_dtype(df[col])]
+        if integer_columns:
+            sums = np.add.reduceat(df[integer_columns].to_numpy(), offsets, axis=0, dtype=np.int64)
+            data.update(zip(integer_columns, sums.T))
+        
+        for col in self.numeric_columns:
+            if col not in data:
+                data[col] = np.add.reduceat(df[col].to_numpy(), offsets)
+        
+        return pd.DataFrame(data, columns=keys + self.numeric_columns)
+    
+    def aggregate_by_sido(self, source: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Aggregate data by sido (시도) level, optionally from a sigungu aggregation."""
         logger.info("Aggregating data by sido (시도)")
         
-        grouped = self.df.groupby('시도명')[self.numeric_columns].sum().reset_index()
+        grouped = self._aggregate_sorted(['시도명'], source)
         grouped['집계수준'] = '시도'
         
         # Reorder columns
         column_order = ['시도명', '집계수준'] + self.numeric_columns
         return grouped[column_order]
     
-    def aggregate_by_sigungu(self) -> pd.DataFrame:
-        """Aggregate data by sigungu (시군구) level."""
+    def aggregate_by_sigungu(self, source: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Aggregate data by sigungu (시군구) level, optionally from an eupmyeondong aggregation."""
         logger.info("Aggregating data by sigungu (시군구)")
         
-        grouped = self.df.groupby(['시도명', '시군구명'])[self.numeric_columns].sum().reset_index()
+        grouped = self._aggregate_sorted(['시도명', '시군구명'], source)
         grouped['집계수준'] = '시군구'
         
         # Reorder columns
@@ -108,13 +325,40 @@ class ElectionDataAggregator:
         """Aggregate data by eupmyeondong (읍면동) level."""
         logger.info("Aggregating data by eupmyeondong (읍면동)")
         
-        grouped = self.df.groupby(['시도명', '시군구명', '읍면동명'])[self.numeric_columns].sum().reset_index()
+        grouped = self._aggregate_sorted(['시도명', '시군구명', '읍면동명'])
         grouped['집계수준'] = '읍면동'
         
         # Reorder columns  
         column_order = ['시도명', '시군구명', '읍면동명', '집계수준'] + self.numeric_columns
         return grouped[column_order]
     
+    def aggregate_all_levels(self) -> Dict[str, pd.DataFrame]:
+        """
+        Aggregate data at every administrative level.
+        
+        Only the eupmyeondong level scans the full data; sigungu and sido totals
+        are rolled up from the much smaller finer-level results. Results are
+        cached so that the per-level files and the combined report share them.
+        
+        Returns:
+            Dict[str, pd.DataFrame]: Dictionary mapping aggregation level to aggregated data
+        """
+        if self._aggregated is None:
+            eupmyeondong = self.aggregate_by_eupmyeondong()
+            
+            # Rows with a missing finer-level name are absent from the finer
+            # aggregation, so fall back to the full data when there are any
+            missing = self.df[self.admin_columns].isna().any()
+            sigungu = self.aggregate_by_sigungu(None if missing['읍면동명'] else eupmyeondong)
+            sido = self.aggregate_by_sido(None if missing['시군구명'] else sigungu)
+            
+            self._aggregated = {
+                'sido': sido,
+                'sigungu': sigungu,
+                'eupmyeondong': eupmyeondong
+            }
+        return self._aggregated
+    
     def create_summary_statistics(self, aggregated_data: Dict[str, pd.DataFrame]) -> pd.DataFrame:
         """Create summary statistics for each aggregation level."""
         logger.info("Creating summary statistics")
@@ -147,25 +391,21 @@ class ElectionDataAggregator:
         output_path.mkdir(exist_ok=True)
         
         # Perform aggregations
-        aggregated_data = {
-            'sido': self.aggregate_by_sido(),
-            'sigungu': self.aggregate_by_sigungu(), 
-            'eupmyeondong': self.aggregate_by_eupmyeondong()
-        }
+        aggregated_data = self.aggregate_all_levels()
         
         # Save files
         output_files = {}
         for level, data in aggregated_data.items():
             filename = f"{level}_aggregated.csv"
             filepath = output_path / filename
-            data.to_csv(filepath, index=False, encoding='utf-8-sig')
+            _write_csv(data, filepath)
             output_files[level] = str(filepath)
             logger.info(f"Saved {level} aggregation to {filepath}")
         
         # Save summary statistics
         summary_stats = self.create_summary_statistics(aggregated_data)
         summary_path = output_path / "aggregation_summary.csv"
-        summary_stats.to_csv(summary_path, index=False, encoding='utf-8-sig')
+        _write_csv(summary_stats, summary_path)
         output_files['summary'] = str(summary_path)
         logger.info(f"Saved summary statistics to {summary_path}")
         
@@ -184,38 +424,27 @@ class ElectionDataAggregator:
         output_path = Path(output_dir)
         output_path.mkdir(exist_ok=True)
         
-        # Perform aggregations
-        sido_data = self.aggregate_by_sido()
-        sigungu_data = self.aggregate_by_sigungu()
-        eupmyeondong_data = self.aggregate_by_eupmyeondong()
-        
-        # Combine all data with consistent columns
-        all_columns = set()
-        for df in [sido_data, sigungu_data, eupmyeondong_data]:
-            all_columns.update(df.columns)
-        
-        # Standardize columns for each dataframe
-        for df_name, df in [('sido', sido_data), ('sigungu', sigungu_data), ('eupmyeondong', eupmyeondong_data)]:
-            for col in all_columns:
-                if col not in df.columns:
-                    if col in ['시도명', '시군구명', '읍면동명']:
-                        df[col] = '' 
-                    else:
-                        df[col] = 0
-        
-        # Combine all dataframes
-        combined_data = pd.concat([sido_data, sigungu_data, eupmyeondong_data], ignore_index=True)
+        # Combine all levels in one concat; columns a level lacks are aligned
+        # by the concat itself rather than added to each frame
+        aggregated_data = self.aggregate_all_levels()
+        combined_data = pd.concat(
+            [aggregated_data['sido'], aggregated_data['sigungu'], aggregated_data['eupmyeondong']],
+            ignore_index=True, sort=False
+        )
         
         # Reorder columns logically
         admin_cols = ['시도명', '시군구명', '읍면동명', '집계수준']
-        other_cols = [col for col in combined_data.columns if col not in admin_cols]
-        column_order = admin_cols + sorted(other_cols)
+        other_cols = sorted(col for col in combined_data.columns if col not in admin_cols)
+        combined_data = combined_data.reindex(columns=admin_cols + other_cols)
         
-        combined_data = combined_data[column_order]
+        # Every level has the same numeric columns; the names a coarser level
+        # lacks stay missing and are written as empty fields
+        for col in ['시도명', '시군구명', '읍면동명']:
+            combined_data[col] = combined_data[col].astype('category')
         
         # Save combined report
         combined_path = output_path / "combined_aggregated_report.csv"
-        combined_data.to_csv(combined_path, index=False, encoding='utf-8-sig')
+        _write_csv(combined_data, combined_path)
         logger.info(f"Saved combined report to {combined_path}")
         
         return str(combined_path)
@@ -224,11 +453,13 @@ class ElectionDataAggregator:
 def main():
     """Main function to run the aggregation script."""
     parser = argparse.ArgumentParser(description="Aggregate Korean election CSV data by administrative levels")
-    parser.add_argument("input_file", help="Input CSV file path")
+    parser.add_argument("input_file", help="Input CSV or Parquet file path")
     parser.add_argument("-o", "--output-dir", default="aggregated_results", 
                        help="Output directory for aggregated files (default: aggregated_results)")
     parser.add_argument("--combined", action="store_true", 
                        help="Generate combined report with all aggregation levels")
+    parser.add_argument("--chunksize", type=int, default=None,
+                       help="Read the input in chunks of this many rows to limit memory use")
     parser.add_argument("--log-level", choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'], 
                        default='INFO', help="Logging level")
     
@@ -239,7 +470,7 @@ def main():
     
     try:
         # Initialize aggregator
-        aggregator = ElectionDataAggregator(args.input_file)
+        aggregator = ElectionDataAggregator(args.input_file, chunksize=args.chunksize)
         
         # Load data
         aggregator.load_data()
@@ -5,7 +5,7 @@ CSV Column Reorder Script
 Reorders CSV columns to match specified order for election data.
 """
 
-import pandas as pd
+import csv
 import os
 import glob
 import argparse
@@ -33,44 +33,64 @@ def reorder_csv_columns(input_file: str, output_file: Optional[str] = None,
             '민주노동당권영국', '무소속송진호', '계', '무효투표수', '기권자수'
         ]
     
+    # Determine output file path
+    if output_file is None:
+        output_file = input_file
+    
+    # When overwriting the input, stream into a temporary file next to it
+    # and swap it in once all rows have been written
+    in_place = os.path.abspath(output_file) == os.path.abspath(input_file)
+    write_path = output_file + '.tmp' if in_place else output_file
+    
     try:
-        # Read the CSV file
-        df = pd.read_csv(input_file, encoding='utf-8')
-        
-        # Get current columns
-        current_columns = list(df.columns)
-        print(f"Current columns in {os.path.basename(input_file)}: {current_columns}")
-        
-        # Check if all desired columns exist in the dataframe
-        missing_columns = [col for col in desired_order if col not in current_columns]
-        if missing_columns:
-            print(f"Warning: Missing columns in {input_file}: {missing_columns}")
+        # Rows are copied as-is; only the column positions change, so there is
+        # no need to parse values into a DataFrame and format them back
+        with open(input_file, 'r', newline='', encoding='utf-8-sig') as fi, \
+             open(write_path, 'w', newline='', encoding='utf-8') as fo:
+            reader = csv.reader(fi)
+            current_columns = next(reader, None)
+            if current_columns is None:
+                raise ValueError("No columns to parse from file")
+            print(f"Current columns in {os.path.basename(input_file)}: {current_columns}")
+            
+            # Check if all desired columns exist in the file
+            missing_columns = [col for col in desired_order if col not in current_columns]
+            if missing_columns:
+                print(f"Warning: Missing columns in {input_file}: {missing_columns}")
+            
+            # Get available columns in desired order
+            available_columns = [col for col in desired_order if col in current_columns]
+            
+            # Add any columns that exist in the file but not in desired order
+            extra_columns = [col for col in current_columns if col not in desired_order]
+            if extra_columns:
+                print(f"Extra columns found (will be added at the end): {extra_columns}")
+                available_columns.extend(extra_columns)
+            
+            positions = [current_columns.index(col) for col in available_columns]
+            padding = [''] * len(current_columns)
+            
+            writer = csv.writer(fo, lineterminator='\n')
+            writer.writerow(available_columns)
+            for row in reader:
+                if not row:
+                    continue
+                if len(row) < len(current_columns):
+                    row += padding[len(row):]
+                writer.writerow([row[i] for i in positions])
         
-        # Get available columns in desired order
-        available_columns = [col for col in desired_order if col in current_columns]
-        
-        # Add any columns that exist in the file but not in desired order
-        extra_columns = [col for col in current_columns if col not in desired_order]
-        if extra_columns:
-            print(f"Extra columns found (will be added at the end): {extra_columns}")
-            available_columns.extend(extra_columns)
-        
-        # Reorder the dataframe
-        df_reordered = df[available_columns]
-        
-        # Determine output file path
-        if output_file is None:
-            output_file = input_file
+        if in_place:
+            os.replace(write_path, output_file)
         
-        # Save the reordered CSV
-        df_reordered.to_csv(output_file, index=False, encoding='utf-8')
         print(f"Successfully reordered columns in {output_file}")
-        print(f"New column order: {list(df_reordered.columns)}")
+        print(f"New column order: {available_columns}")
         
         return True
         
     except Exception as e:
         print(f"Error processing {input_file}: {str(e)}")
+        if in_place and os.path.exists(write_path):
+            os.remove(write_path)
         return False
 
 def reorder_multiple_csv_files(input_directory: str, output_directory: Optional[str] = None,
@@ -5,13 +5,21 @@ This script merges multiple CSV files from the csv_results directory into a sing
 consolidated file, adding city and town name columns and cleaning the data.
 """
 
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
 import os
 import re
+import csv
+import json
 from pathlib import Path
 from typing import Dict, List
 import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from election_crawler import ElectionCrawler
+from config import DEFAULT_ELECTION_ID, MAX_WORKERS
 
 # Setup logging
 logging.basicConfig(
@@ -20,30 +28,98 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Per-town CSV filename: election_report_{cityCode}_{townCode}_{timestamp}.csv
+_FILENAME_RE = re.compile(r'election_report_(\d+)_(\d+)_\d+\.csv')
+
+# Vote count columns that clean_dataframe parses into integers
+_NUMERIC_COLUMNS = [
+    '선거인수', '투표수', 
+    '더불어민주당이재명', '국민의힘김문수', '개혁신당이준석', '민주노동당권영국', '무소속송진호', 
+    '계', '무효투표수', '기권자수', 
+]
+
+# Per-process merger used by _process_one, created by _init_worker
+_worker_merger = None
+
+
+def _init_worker():
+    """Create the merger instance used by a worker process."""
+    global _worker_merger
+    _worker_merger = CSVMerger()
+
+
+def _process_one(task):
+    """
+    Read and clean a single CSV file in a worker process.
+    
+    Args:
+        task: Tuple of (csv_file, city_name, town_name)
+        
+    Returns:
+        Cleaned dataframe, or None if the file could not be processed
+    """
+    csv_file, city_name, town_name = task
+    logger.info(f"Processing {csv_file.name}")
+    
+    try:
+        # Read CSV file (multi-threaded pyarrow parser)
+        df = pd.read_csv(csv_file, encoding='utf-8', engine='pyarrow')
+        
+        # Clean and transform
+        return _worker_merger.clean_dataframe(df, city_name, town_name)
+        
+    except Exception as e:
+        logger.error(f"Error processing {csv_file.name}: {e}")
+        return None
+
 
 class CSVMerger:
     """
     Merges election result CSV files with proper city/town name mapping.
     """
     
-    def __init__(self, csv_dir: str = "csv_results", output_file: str = "merged_election_results.csv"):
+    def __init__(self, csv_dir: str = "csv_results", output_file: str = "merged_election_results.csv",
+                 max_workers: int = MAX_WORKERS):
         """
         Initialize the CSV merger.
         
         Args:
             csv_dir: Directory containing CSV files to merge
-            output_file: Output filename for merged results
+            output_file: Output filename for merged results (written as Parquet
+                if it ends with .parquet, otherwise as CSV)
+            max_workers: Number of worker processes for reading and cleaning files
         """
         self.csv_dir = Path(csv_dir)
         self.output_file = output_file
+        self.max_workers = max_workers
+        self.mapping_cache_file = Path(f".town_cache_{DEFAULT_ELECTION_ID}.json")
         self.city_mapping = {}
         self.town_mapping = {}
-        self.merged_data = []
+        
+        # Running statistics for the merged output, which is written
+        # incrementally rather than concatenated in memory
+        self.merged_columns = None
+        self.merged_dtypes = None
+        self.merged_schema = None
+        self.merged_rows = 0
+        self.unique_values = {'시도명': set(), '시군구명': set(), '읍면동명': set()}
         
     def fetch_location_mappings(self):
         """
         Fetch city and town code mappings using the existing ElectionCrawler.
+        
+        Mappings are cached in a local JSON file per election, so later runs
+        skip the network requests entirely.
         """
+        if self.mapping_cache_file.exists():
+            logger.info(f"Loading location mappings from {self.mapping_cache_file}")
+            with open(self.mapping_cache_file, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            self.city_mapping = cached['city']
+            self.town_mapping = cached['town']
+            logger.info(f"Found {len(self.city_mapping)} city mappings and {len(self.town_mapping)} town mappings")
+            return
+        
         logger.info("Fetching location mappings from election server...")
         
         try:
@@ -54,15 +130,26 @@ class CSVMerger:
             self.city_mapping = {city.code: city.name for city in city_codes}
             logger.info(f"Found {len(self.city_mapping)} city mappings")
             
-            # Build town mapping by fetching towns for each city
-            for city in city_codes:
-                logger.info(f"Fetching towns for {city.name} ({city.code})")
-                towns = crawler.get_town_codes_for_city(city.code)
+            # Build town mapping by fetching towns for all cities concurrently
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                town_lists = list(executor.map(
+                    lambda city: crawler.get_town_codes_for_city(city.code), city_codes))
+            
+            for city, towns in zip(city_codes, town_lists):
+                logger.info(f"Fetched {len(towns)} towns for {city.name} ({city.code})")
                 for town in towns:
                     self.town_mapping[town.code] = town.name
             
             logger.info(f"Found {len(self.town_mapping)} town mappings")
             
+            # Only cache complete results; a failed city fetch returns no towns
+            if city_codes and all(town_lists):
+                with open(self.mapping_cache_file, 'w', encoding='utf-8') as f:
+                    json.dump({'city': self.city_mapping, 'town': self.town_mapping}, f, ensure_ascii=False)
+                logger.info(f"Cached location mappings to {self.mapping_cache_file}")
+            else:
+                logger.warning("Some cities returned no towns; location mappings were not cached")
+            
         except Exception as e:
             logger.error(f"Failed to fetch location mappings: {e}")
             raise
@@ -77,27 +164,8 @@ class CSVMerger:
         Returns:
             Tuple of (city_code, town_code) or (None, None) if parsing fails
         """
-        match = re.match(r'election_report_(\d+)_(\d+)_\d+\.csv', filename)
-        if match:
-            return match.group(1), match.group(2)
-        return None, None
-    
-    def convert_comma_numbers(self, value):
-        """
-        Convert comma-separated number strings to integers.
-        
-        Args:
-            value: String value that might contain comma-separated numbers
-            
-        Returns:
-            Integer value or original value if conversion fails
-        """
-        if isinstance(value, str):
-            # Remove quotes and commas, then try to convert to int
-            cleaned = value.strip('"').replace(',', '')
-            if cleaned.isdigit():
-                return int(cleaned)
-        return value
+        match = _FILENAME_RE.match(filename)
+        return match.group(1, 2) if match else (None, None)
     
     def clean_dataframe(self, df: pd.DataFrame, city_name: str, town_name: str):
         """
@@ -111,29 +179,31 @@ class CSVMerger:
         Returns:
             Cleaned dataframe
         """
-        # Make a copy to avoid modifying original
-        df = df.copy()
-        
-        # Add city and town name columns at the beginning
-        df.insert(0, '시도명', city_name)
-        df.insert(1, '시군구명', town_name)
+        # Add city and town name columns at the beginning; the concat builds a
+        # new frame in one pass, so the original is not modified
+        location = pd.DataFrame({'시도명': city_name, '시군구명': town_name}, index=df.index)
+        df = pd.concat([location, df], axis=1)
         
         # Convert comma-separated numbers to integers for numeric columns
-        numeric_columns = [
-            '선거인수', '투표수', 
-            '더불어민주당이재명', '국민의힘김문수', '개혁신당이준석', '민주노동당권영국', '무소속송진호', 
-            '계', '무효투표수', '기권자수', 
-        ]
-        
-        for col in numeric_columns:
-            if col in df.columns:
-                df[col] = df[col].apply(self.convert_comma_numbers)
+        numeric_cols_present = [col for col in _NUMERIC_COLUMNS if col in df.columns]
+        if numeric_cols_present:
+            # Parse the whole numeric block as one flat column, then reshape it
+            # back so the columns are written in a single assignment
+            block = df[numeric_cols_present].to_numpy(dtype=object).ravel()
+            cleaned = pd.Series(block).astype(str).str.replace(',', '', regex=False).str.strip('"')
+            parsed = pd.to_numeric(cleaned, errors='coerce').fillna(0).astype(np.int64)
+            df[numeric_cols_present] = parsed.to_numpy().reshape(len(df), len(numeric_cols_present))
         
         # Forward-fill empty 읍면동명 values
         if '읍면동명' in df.columns:
-            # Replace empty strings with NaN for proper forward fill
-            df['읍면동명'] = df['읍면동명'].replace('', pd.NA)
-            df['읍면동명'] = df['읍면동명'].fillna(method='ffill')
+            # Point each empty row at the last non-empty row before it and
+            # gather, which runs as a single vectorized pass
+            values = df['읍면동명'].to_numpy()
+            missing = pd.isna(values)
+            missing[~missing] = values[~missing] == ''
+            idx = np.where(missing, 0, np.arange(len(values)))
+            np.maximum.accumulate(idx, out=idx)
+            df['읍면동명'] = values[idx]
         
         # Filter out only summary rows (not voting type rows)
         rows_to_remove = [
@@ -153,7 +223,7 @@ class CSVMerger:
             df = df[~df['투표구명'].isin(rows_to_remove)]
         
         # # Remove rows where all voting numbers are 0
-        # voting_cols = [col for col in numeric_columns if col in df.columns and col not in ['선거인수', '기권자수']]
+        # voting_cols = [col for col in _NUMERIC_COLUMNS if col in df.columns and col not in ['선거인수', '기권자수']]
         # if voting_cols:
         #     # Check if all voting columns are 0
         #     all_zeros = (df[voting_cols] == 0).all(axis=1)
@@ -163,7 +233,10 @@ class CSVMerger:
     
     def process_csv_files(self):
         """
-        Process all CSV files in the directory and merge them.
+        Process all CSV files in the directory and merge them into the output file.
+        
+        Cleaned files are appended to the output as they complete, so peak
+        memory is bounded by a single file rather than the whole merged table.
         """
         if not self.csv_dir.exists():
             raise FileNotFoundError(f"CSV directory not found: {self.csv_dir}")
@@ -171,11 +244,9 @@ class CSVMerger:
         csv_files = list(self.csv_dir.glob("*.csv"))
         logger.info(f"Found {len(csv_files)} CSV files to process")
         
-        processed_count = 0
+        tasks = []
         
         for csv_file in csv_files:
-            logger.info(f"Processing {csv_file.name}")
-            
             # Extract codes from filename
             city_code, town_code = self.extract_codes_from_filename(csv_file.name)
             if not city_code or not town_code:
@@ -191,72 +262,134 @@ class CSVMerger:
             if town_name.startswith("Unknown_"):
                 logger.warning(f"Unknown town code: {town_code}")
             
-            try:
-                # Read CSV file
-                df = pd.read_csv(csv_file, encoding='utf-8')
-                
-                # Clean and transform
-                cleaned_df = self.clean_dataframe(df, city_name, town_name)
-                
-                # Add to merged data
-                self.merged_data.append(cleaned_df)
-                processed_count += 1
-                
-            except Exception as e:
-                logger.error(f"Error processing {csv_file.name}: {e}")
-                continue
+            tasks.append((csv_file, city_name, town_name))
+        
+        # Fix the output columns up front from the file headers, in the order
+        # pd.concat would have produced, so no file's columns are dropped
+        self.merged_columns = self._merged_column_order(tasks)
+        
+        # Read and clean files in parallel; map preserves the file order
+        processed_count = 0
+        output = None
+        try:
+            with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker) as executor:
+                for (csv_file, _, _), cleaned_df in zip(tasks, executor.map(_process_one, tasks, chunksize=4)):
+                    if cleaned_df is None:
+                        continue
+                    
+                    if output is None:
+                        logger.info(f"Saving to {self.output_file}")
+                        output = self._open_output()
+                    
+                    try:
+                        self.append_merged_chunk(cleaned_df, output)
+                        processed_count += 1
+                    except Exception as e:
+                        logger.error(f"Error processing {csv_file.name}: {e}")
+        except BaseException:
+            # Don't leave a truncated merge behind
+            if output is not None:
+                output.close()
+                output = None
+                os.remove(self.output_file)
+            raise
+        finally:
+            if output is not None:
+                output.close()
         
         logger.info(f"Successfully processed {processed_count} CSV files")
     
-    def save_merged_results(self):
-        """
-        Save the merged results to a CSV file.
+    def _merged_column_order(self, tasks) -> List[str]:
         """
-        if not self.merged_data:
-            logger.error("No data to save")
-            return
+        Build the merged column list from the header row of every file.
         
-        logger.info("Merging all dataframes...")
-        merged_df = pd.concat(self.merged_data, ignore_index=True)
+        Args:
+            tasks: Tuples of (csv_file, city_name, town_name) to merge
+            
+        Returns:
+            Location columns followed by the union of file columns, in order
+            of first appearance
+        """
+        columns = {'시도명': None, '시군구명': None}
+        for csv_file, _, _ in tasks:
+            try:
+                with open(csv_file, newline='', encoding='utf-8-sig') as f:
+                    columns.update(dict.fromkeys(next(csv.reader(f), [])))
+            except Exception as e:
+                logger.error(f"Error reading header of {csv_file.name}: {e}")
+        return list(columns)
+    
+    def _open_output(self):
+        """
+        Open the merged output file.
         
-        logger.info(f"Merged dataframe shape: {merged_df.shape}")
-        logger.info(f"Columns: {list(merged_df.columns)}")
+        The schema is fixed before any data is written, so it cannot follow
+        the types inferred from one file: the vote counts that clean_dataframe
+        parses are integers, and every other column is stored as text. A
+        column that holds numbers in one file and '재투표' in the next then
+        still fits.
         
-        # Save to CSV
-        logger.info(f"Saving to {self.output_file}")
-        merged_df.to_csv(self.output_file, index=False, encoding='utf-8')
+        Returns:
+            ParquetWriter for .parquet output, otherwise an Arrow CSVWriter
+        """
+        self.merged_schema = pa.schema([
+            pa.field(col, pa.int64() if col in _NUMERIC_COLUMNS else pa.string())
+            for col in self.merged_columns])
         
-        # Print summary statistics
-        self.print_summary_stats(merged_df)
+        if str(self.output_file).endswith('.parquet'):
+            return pq.ParquetWriter(self.output_file, self.merged_schema, compression='zstd', use_dictionary=True)
+        return pacsv.CSVWriter(str(self.output_file), self.merged_schema)
     
-    def print_summary_stats(self, df: pd.DataFrame):
+    def append_merged_chunk(self, df: pd.DataFrame, output):
         """
-        Print summary statistics about the merged data.
+        Append a cleaned dataframe to the merged output and update statistics.
+        
+        Chunks are aligned to the merged columns; columns a file lacks are left empty.
         
         Args:
-            df: Merged dataframe
+            df: Cleaned dataframe
+            output: Writer returned by _open_output
         """
+        df = df.reindex(columns=self.merged_columns)
+        if self.merged_dtypes is None:
+            self.merged_dtypes = df.dtypes
+        
+        # Cast to the merged schema; other columns become text whatever type
+        # this file's values were read as
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        output.write_table(table.cast(self.merged_schema))
+        
+        self.merged_rows += len(df)
+        for col, values in self.unique_values.items():
+            if col in df.columns:
+                values.update(df[col].dropna().unique())
+    
+    def print_summary_stats(self):
+        """
+        Print summary statistics about the merged data.
+        """
+        if self.merged_dtypes is None:
+            logger.error("No data to save")
+            return
+        
         logger.info("=" * 50)
         logger.info("MERGE SUMMARY")
         logger.info("=" * 50)
-        logger.info(f"Total rows: {len(df):,}")
-        logger.info(f"Total columns: {len(df.columns)}")
+        logger.info(f"Total rows: {self.merged_rows:,}")
+        logger.info(f"Total columns: {len(self.merged_columns)}")
         
-        if '시도명' in df.columns:
-            cities = df['시도명'].nunique()
-            logger.info(f"Unique cities: {cities}")
+        if '시도명' in self.merged_columns:
+            logger.info(f"Unique cities: {len(self.unique_values['시도명'])}")
         
-        if '시군구명' in df.columns:
-            towns = df['시군구명'].nunique()
-            logger.info(f"Unique towns: {towns}")
+        if '시군구명' in self.merged_columns:
+            logger.info(f"Unique towns: {len(self.unique_values['시군구명'])}")
         
-        if '읍면동명' in df.columns:
-            districts = df['읍면동명'].nunique()
-            logger.info(f"Unique districts: {districts}")
+        if '읍면동명' in self.merged_columns:
+            logger.info(f"Unique districts: {len(self.unique_values['읍면동명'])}")
         
         # Show data types
         logger.info("\nColumn data types:")
-        for col, dtype in df.dtypes.items():
+        for col, dtype in self.merged_dtypes.items():
             logger.info(f"  {col}: {dtype}")
         
         logger.info("=" * 50)
@@ -271,11 +404,11 @@ class CSVMerger:
             # Step 1: Fetch location mappings
             self.fetch_location_mappings()
             
-            # Step 2: Process CSV files
+            # Step 2: Process CSV files and write merged results
             self.process_csv_files()
             
-            # Step 3: Save merged results
-            self.save_merged_results()
+            # Step 3: Print summary statistics
+            self.print_summary_stats()
             
             logger.info("CSV merge completed successfully!")
             
@@ -7,26 +7,64 @@ logging, and performance features.
 """
 
 import requests
-from bs4 import BeautifulSoup
+from lxml import html as lhtml
 import os
 import time
 import logging
 import argparse
 import json
+import re
 from urllib.parse import unquote_plus
 from pathlib import Path
 from typing import List, Tuple, Optional, Dict
 from concurrent.futures import ThreadPoolExecutor, as_completed
-import hashlib
 from dataclasses import dataclass
 import random
+import io
+import threading
 
 from config import *
 
 
+# Content sniffing patterns, each matched in a single pass over the raw
+# bytes so no decoded copy of the buffer is needed
+_HTML_SNIFF_RE = re.compile(rb'<!doctype html|<html|<head>|<body>|<table', re.IGNORECASE)
+_HTML_TAG_RE = re.compile(rb'<html|<table|<tr|<td', re.IGNORECASE)
+_ERROR_RE = re.compile(rb'error|exception|404|500|not found', re.IGNORECASE)
+
+# Excel file signatures: OLE2 compound document (.xls) and ZIP (.xlsx)
+_OLE2_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+_ZIP_MAGIC = b'PK\x03\x04'
+
+# Separator line for the final statistics banner
+_BANNER = "=" * 50
+
+# Fallback report names: election_report_<city>_<town>_<timestamp>.<ext>
+_REPORT_FILENAME_RE = re.compile(r'election_report_(\d+)_(\d+)_\d+\.(?:html|xls|xlsx)$')
+
+# Characters that are invalid in file names, all mapped to '_'
+_SANITIZE_TABLE = str.maketrans({char: '_' for char in '<>:"/\\|?*'})
+
+
+def _sniff_magic(head: bytes) -> Optional[str]:
+    """Return 'excel' if head starts with an Excel file signature, else None."""
+    if head[:8] == _OLE2_MAGIC or head[:4] == _ZIP_MAGIC:
+        return 'excel'
+    return None
+
+
+def _write_fully(f: io.FileIO, data: bytes):
+    """Write all of data to an unbuffered file, retrying short writes."""
+    view = memoryview(data)
+    while view:
+        view = view[f.write(view):]
+
+
 @dataclass
 class LocationInfo:
     """Data class for location information."""
+    # Declared by hand rather than dataclass(slots=True) to keep Python 3.7 support
+    __slots__ = ('code', 'name')
     code: str
     name: str
 
@@ -36,6 +74,36 @@ class ElectionCrawlerError(Exception):
     pass
 
 
+class RateLimiter:
+    """
+    Thread-safe limiter that spaces request starts to a target rate.
+    
+    Callers only wait for whatever is left of the interval since the previous
+    request started, so time already spent downloading counts towards it.
+    """
+    
+    def __init__(self, rate: float):
+        """
+        Initialize the rate limiter.
+        
+        Args:
+            rate: Maximum number of requests per second
+        """
+        self.interval = 1.0 / rate
+        self._next_slot = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self):
+        """Block until the next request is allowed to start."""
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        
+        if wait > 0:
+            time.sleep(wait)
+
+
 class ElectionCrawler:
     """
     Enhanced election results crawler with improved error handling and features.
@@ -43,7 +111,8 @@ class ElectionCrawler:
     
     def __init__(self, election_id: str = DEFAULT_ELECTION_ID, 
                  election_code: str = DEFAULT_ELECTION_CODE,
-                 download_dir: str = DOWNLOAD_DIR):
+                 download_dir: str = DOWNLOAD_DIR,
+                 max_workers: int = MAX_WORKERS):
         """
         Initialize the election crawler.
         
@@ -51,10 +120,25 @@ class ElectionCrawler:
             election_id: The election ID to crawl
             election_code: The election type code
             download_dir: Directory to save downloaded files
+            max_workers: Number of concurrent workers the connection pool is sized for
         """
         self.election_id = election_id
         self.election_code = election_code
         self.download_dir = Path(download_dir)
+        self.max_workers = max_workers
+        
+        # Report request fields that are the same for every location
+        self._payload_template = {
+            "electionId": election_id,
+            "requestURI": f"/electioninfo/{election_id}/vc/vccp08.jsp",
+            "topMenuId": "VC",
+            "secondMenuId": "VCCP08",
+            "menuId": "VCCP08",
+            "statementId": STATEMENT_ID_MAP.get(election_code, "VCCP08_#1"),
+            "electionCode": election_code,
+            "reportType": "XLS",
+        }
+        
         self.session = requests.Session()
         self.logger = self._setup_logging()
         self.stats = {
@@ -64,6 +148,16 @@ class ElectionCrawler:
             'total_size': 0
         }
         
+        # Sizes of files already in the download directory, keyed by name;
+        # scanned once on first use instead of stat-ing each candidate
+        self._existing_files: Optional[Dict[str, int]] = None
+        # Existing report file names keyed by (city_code, town_code)
+        self._existing_reports: Dict[Tuple[str, str], str] = {}
+        
+        # Paces requests to BASE_DELAY apart; _crawl_concurrent raises the
+        # rate so each worker keeps that spacing
+        self.rate_limiter = RateLimiter(1 / BASE_DELAY)
+        
         # Setup session and create download directory
         self._setup_session()
         self._create_download_dir()
@@ -98,8 +192,15 @@ class ElectionCrawler:
         self.session.headers.update(HEADERS)
         self.session.headers['Referer'] = INIT_PAGE_URL
         
-        # Configure request adapters for better reliability
+        # Configure request adapters for better reliability; keep one pooled
+        # keep-alive connection per worker so threads never wait on the pool
+        # or drop sockets back to a fresh handshake. Blocking on a full pool
+        # keeps every request on those warm connections instead of opening
+        # throwaway ones that are discarded after a single response.
         adapter = requests.adapters.HTTPAdapter(
+            pool_connections=self.max_workers,
+            pool_maxsize=self.max_workers,
+            pool_block=True,
             max_retries=requests.adapters.Retry(
                 total=MAX_RETRIES,
                 backoff_factor=0.3,
@@ -112,15 +213,18 @@ class ElectionCrawler:
     def _create_download_dir(self):
         """Create download directory if it doesn't exist."""
         self.download_dir.mkdir(exist_ok=True)
-        self.logger.info(f"Download directory: {self.download_dir.absolute()}")
+        self.logger.info("Download directory: %s", self.download_dir.absolute())
     
-    def _make_request_with_retry(self, method: str, url: str, **kwargs) -> requests.Response:
+    def _make_request_with_retry(self, method: str, url: str, rate_limited: bool = False,
+                                 **kwargs) -> requests.Response:
         """
         Make HTTP request with retry logic and exponential backoff.
         
         Args:
             method: HTTP method (GET, POST)
             url: Target URL
+            rate_limited: Pace the request with the rate limiter (report
+                downloads, which BASE_DELAY throttles)
             **kwargs: Additional arguments for requests
             
         Returns:
@@ -135,16 +239,24 @@ class ElectionCrawler:
                 if attempt > 0:
                     jitter = random.uniform(0.5, 1.5)
                     delay = RETRY_DELAY * (2 ** attempt) * jitter
-                    self.logger.info(f"Retrying in {delay:.2f} seconds (attempt {attempt + 1}/{MAX_RETRIES})")
+                    self.logger.info("Retrying in %.2f seconds (attempt %s/%s)", delay, attempt + 1, MAX_RETRIES)
                     time.sleep(delay)
                 
                 kwargs.setdefault('timeout', TIMEOUT)
+                if rate_limited:
+                    self.rate_limiter.acquire()
                 response = self.session.request(method, url, **kwargs)
-                response.raise_for_status()
+                try:
+                    response.raise_for_status()
+                except requests.exceptions.HTTPError:
+                    # Streamed responses hold their connection until closed;
+                    # release it so the blocking pool doesn't run dry
+                    response.close()
+                    raise
                 return response
                 
             except requests.exceptions.RequestException as e:
-                self.logger.warning(f"Request failed (attempt {attempt + 1}/{MAX_RETRIES}): {e}")
+                self.logger.warning("Request failed (attempt %s/%s): %s", attempt + 1, MAX_RETRIES, e)
                 if attempt == MAX_RETRIES - 1:
                     raise ElectionCrawlerError(f"Failed to make request after {MAX_RETRIES} attempts: {e}")
         
@@ -161,27 +273,24 @@ class ElectionCrawler:
         
         try:
             response = self._make_request_with_retry('GET', INIT_PAGE_URL)
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # Decode with the charset from the HTTP header; without a meta
+            # charset tag libxml2 would fall back to Latin-1
+            parser = lhtml.HTMLParser(encoding=response.encoding or 'utf-8')
+            tree = lhtml.fromstring(response.content, parser=parser)
             
             # Extract city codes
-            city_select = soup.find('select', id='cityCode')
-            city_codes = []
-            if city_select:
-                for option in city_select.find_all('option'):
-                    value = option.get('value')
-                    if value and value != '-1':
-                        city_codes.append(LocationInfo(value, option.text.strip()))
+            city_codes = [
+                LocationInfo(option.get('value'), option.text_content().strip())
+                for option in tree.xpath('//select[@id="cityCode"]/option[@value and @value!="" and @value!="-1"]')
+            ]
             
             # Extract all town codes from the initial page
-            town_select = soup.find('select', id='townCode')
-            all_town_codes = []
-            if town_select:
-                for option in town_select.find_all('option'):
-                    value = option.get('value')
-                    if value and value != '-1':
-                        all_town_codes.append(LocationInfo(value, option.text.strip()))
-            
-            self.logger.info(f"Found {len(city_codes)} cities and {len(all_town_codes)} initial town codes")
+            all_town_codes = [
+                LocationInfo(option.get('value'), option.text_content().strip())
+                for option in tree.xpath('//select[@id="townCode"]/option[@value and @value!="" and @value!="-1"]')
+            ]
+            
+            self.logger.info("Found %s cities and %s initial town codes", len(city_codes), len(all_town_codes))
             return city_codes, all_town_codes
             
         except Exception as e:
@@ -204,7 +313,8 @@ class ElectionCrawler:
         
         try:
             response = self._make_request_with_retry('GET', TOWN_CODE_URL, params=params)
-            response_data = response.json()
+            # Decode the raw bytes directly; json detects the UTF encoding itself
+            response_data = json.loads(response.content)
             
             # Handle nested JSON structure: jsonResult.body contains the town codes
             if 'jsonResult' in response_data and 'body' in response_data['jsonResult']:
@@ -221,7 +331,7 @@ class ElectionCrawler:
             return town_codes
             
         except (requests.exceptions.RequestException, ValueError) as e:
-            self.logger.error(f"Failed to fetch town codes for city {city_code}: {e}")
+            self.logger.error("Failed to fetch town codes for city %s: %s", city_code, e)
             return []
     
     def _sanitize_filename(self, filename: str) -> str:
@@ -234,10 +344,8 @@ class ElectionCrawler:
         Returns:
             Sanitized filename
         """
-        # Remove or replace invalid characters
-        invalid_chars = '<>:"/\\|?*'
-        for char in invalid_chars:
-            filename = filename.replace(char, '_')
+        # Replace invalid characters in a single pass
+        filename = filename.translate(_SANITIZE_TABLE)
         
         # Ensure reasonable length
         if len(filename) > 200:
@@ -250,6 +358,43 @@ class ElectionCrawler:
         """Generate title for the download request."""
         return f"[제21대 대통령선거] [{city_name}] [{town_name}]"
     
+    def _load_existing_files(self):
+        """
+        Scan the download directory once, recording file sizes by name and
+        indexing existing reports by their city and town codes.
+        """
+        with os.scandir(self.download_dir) as entries:
+            self._existing_files = {entry.name: entry.stat().st_size for entry in entries if entry.is_file()}
+        
+        self._existing_reports = {}
+        for name in self._existing_files:
+            self._record_report(name)
+    
+    def _record_report(self, filename: str):
+        """Index a report file name by its city and town codes, if it has them."""
+        match = _REPORT_FILENAME_RE.match(filename)
+        if match:
+            self._existing_reports[match.groups()] = filename
+    
+    def _existing_report(self, city_code: str, town_code: str) -> Optional[str]:
+        """
+        Find a valid report already downloaded for a location.
+        
+        Args:
+            city_code: City code
+            town_code: Town code
+            
+        Returns:
+            Name of the existing report file, or None if it must be downloaded
+        """
+        if self._existing_files is None:
+            self._load_existing_files()
+        
+        filename = self._existing_reports.get((city_code, town_code))
+        if filename and self._validate_file_size(self.download_dir / filename, self._existing_files[filename]):
+            return filename
+        return None
+    
     def _file_exists_and_valid(self, filepath: Path) -> bool:
         """
         Check if file exists and is valid (not empty, reasonable size).
@@ -261,9 +406,13 @@ class ElectionCrawler:
         Returns:
             True if file exists and appears valid
         """
+        if self._existing_files is None:
+            self._load_existing_files()
+        
         # Check the exact filepath first
-        if filepath.exists():
-            return self._validate_file_size(filepath)
+        size = self._existing_files.get(filepath.name)
+        if size is not None:
+            return self._validate_file_size(filepath, size)
         
         # Check for alternative extensions
         base_path = filepath.with_suffix('')
@@ -271,25 +420,26 @@ class ElectionCrawler:
         
         for ext in alternative_extensions:
             alt_filepath = base_path.with_suffix(ext)
-            if alt_filepath.exists():
-                self.logger.info(f"Found existing file with alternative extension: {alt_filepath}")
-                return self._validate_file_size(alt_filepath)
+            size = self._existing_files.get(alt_filepath.name)
+            if size is not None:
+                self.logger.info("Found existing file with alternative extension: %s", alt_filepath)
+                return self._validate_file_size(alt_filepath, size)
         
         return False
     
-    def _validate_file_size(self, filepath: Path) -> bool:
+    def _validate_file_size(self, filepath: Path, size: int) -> bool:
         """
         Validate that a file has reasonable size.
         
         Args:
             filepath: Path to the file
+            size: File size in bytes
             
         Returns:
             True if file size is valid
         """
-        size = filepath.stat().st_size
         if size < 512:  # Less than 512 bytes is probably not valid
-            self.logger.warning(f"File {filepath} exists but is too small ({size} bytes)")
+            self.logger.warning("File %s exists but is too small (%s bytes)", filepath, size)
             return False
         
         return True
@@ -308,113 +458,125 @@ class ElectionCrawler:
         Returns:
             True if download successful, False otherwise
         """
-        statement_id = STATEMENT_ID_MAP.get(self.election_code, "VCCP08_#1")
-        f_title = self._generate_title(city_name, town_name)
+        # Skip before issuing the request when this location's report is
+        # already on disk, so reruns cost no network round trip
+        existing = self._existing_report(city_code, town_code)
+        if existing:
+            self.logger.info("File already exists and is valid: %s", existing)
+            self.stats['skipped'] += 1
+            return True
         
-        payload = {
-            "electionId": self.election_id,
-            "requestURI": f"/electioninfo/{self.election_id}/vc/vccp08.jsp",
-            "topMenuId": "VC",
-            "secondMenuId": "VCCP08",
-            "menuId": "VCCP08",
-            "statementId": statement_id,
-            "electionCode": self.election_code,
-            "cityCode": city_code,
-            "townCode": town_code,
-            "reportType": "XLS",
-            "fTitle": f_title,
-        }
+        payload = self._payload_template.copy()
+        payload.update(
+            cityCode=city_code,
+            townCode=town_code,
+            fTitle=self._generate_title(city_name, town_name),
+        )
         
-        self.logger.info(f"Downloading: {city_name} ({city_code}), {town_name} ({town_code})")
+        self.logger.info("Downloading: %s (%s), %s (%s)", city_name, city_code, town_name, town_code)
         
         try:
-            response = self._make_request_with_retry('POST', REPORT_URL, data=payload, stream=True)
-            
-            # Determine filename
-            filename = self._get_filename_from_response(response, city_code, town_code)
-            filepath = self.download_dir / filename
-            
-            # Skip if file already exists and is valid
-            if self._file_exists_and_valid(filepath):
-                self.logger.info(f"File already exists and is valid: {filename}")
-                self.stats['skipped'] += 1
-                return True
-            
-            # Download file
-            file_size = 0
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
-                    if chunk:
-                        f.write(chunk)
-                        file_size += len(chunk)
-            
-            # Validate downloaded content
-            if self._validate_downloaded_content(filepath, filename):
-                self.logger.info(f"Successfully downloaded: {filename} ({file_size:,} bytes)")
+            # Close the streamed response on every path so its connection goes
+            # back to the pool even when the body is never read
+            with self._make_request_with_retry('POST', REPORT_URL, rate_limited=True,
+                                              data=payload, stream=True) as response:
+                # Take the first block from the same stream that writes the
+                # rest; a second iterator would leave a chunked body cut short.
+                # Only its start is needed to sniff the content type.
+                chunks = response.raw.stream(CHUNK_SIZE, decode_content=True)
+                first_chunk = next(chunks, b'')
+                content_start = first_chunk[:SNIFF_SIZE]
+                
+                # Determine filename
+                filename = self._get_filename_from_response(response, content_start, city_code, town_code)
+                filepath = self.download_dir / filename
+                
+                # Skip if file already exists and is valid
+                if self._file_exists_and_valid(filepath):
+                    self.logger.info("File already exists and is valid: %s", filename)
+                    self.stats['skipped'] += 1
+                    return True
+                
+                # Download file, starting with the first block. The rest is
+                # streamed in large blocks through an unbuffered file, so each
+                # block goes straight to write(2) without an extra copy.
+                with io.FileIO(filepath, 'w') as f:
+                    _write_fully(f, first_chunk)
+                    for chunk in chunks:
+                        _write_fully(f, chunk)
+                    file_size = f.tell()
+            
+            # Validate downloaded content against the chunk already in memory;
+            # a conclusive Content-Type header spares sniffing it again
+            header_type = self._header_content_type(response)
+            if self._validate_downloaded_content(filepath, filename, content_start, header_type):
+                self.logger.info("Successfully downloaded: %s (%s bytes)", filename, format(file_size, ','))
+                self._existing_files[filename] = file_size
+                self._record_report(filename)
                 self.stats['downloaded'] += 1
                 self.stats['total_size'] += file_size
                 return True
             else:
-                self.logger.error(f"Downloaded file validation failed: {filename}")
+                self.logger.error("Downloaded file validation failed: %s", filename)
                 self.stats['errors'] += 1
                 return False
             
         except Exception as e:
-            self.logger.error(f"Error downloading for {city_name}, {town_name}: {e}")
+            self.logger.error("Error downloading for %s, %s: %s", city_name, town_name, e)
             self.stats['errors'] += 1
             return False
     
-    def _detect_content_type(self, response: requests.Response) -> str:
+    def _header_content_type(self, response: requests.Response) -> Optional[str]:
         """
-        Detect the actual content type from response headers and content.
+        Get the content type declared by the Content-Type header.
         
         Args:
             response: HTTP response object
             
         Returns:
-            Detected content type ('html', 'excel', or 'unknown')
+            'html' or 'excel' when the header is conclusive, None when the
+            content has to be inspected (e.g. application/octet-stream)
         """
-        # Check Content-Type header first
         content_type = response.headers.get('Content-Type', '').lower()
         
         if 'text/html' in content_type or 'application/html' in content_type:
             return 'html'
         elif 'application/vnd.ms-excel' in content_type or 'application/excel' in content_type:
             return 'excel'
-        elif 'application/octet-stream' in content_type:
-            # Ambiguous content type, need to inspect content
-            pass
         
-        # Inspect the beginning of the content to determine type
-        try:
-            # Get first few kilobytes of content
-            content_start = response.content[:4096].decode('utf-8', errors='ignore').lower()
-            
-            # Check for HTML indicators
-            html_indicators = ['<!doctype html', '<html', '<head>', '<body>', '<table']
-            if any(indicator in content_start for indicator in html_indicators):
-                return 'html'
-            
-            # Check for Excel magic numbers or patterns
-            # Excel files start with specific byte patterns
-            content_bytes = response.content[:8]
-            if (content_bytes.startswith(b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1') or  # OLE2 header
-                content_bytes.startswith(b'PK\x03\x04')):  # ZIP header (modern Excel)
-                return 'excel'
-                
-        except (UnicodeDecodeError, AttributeError):
-            # If we can't decode content, assume it's binary (Excel)
-            return 'excel'
+        return None
+    
+    def _detect_content_type(self, response: requests.Response, content_start: bytes) -> str:
+        """
+        Detect the actual content type from response headers and content.
+        
+        Args:
+            response: HTTP response object
+            content_start: First chunk of the response body
+            
+        Returns:
+            Detected content type ('html', 'excel', or 'unknown')
+        """
+        # Check Content-Type header first
+        header_type = self._header_content_type(response)
+        if header_type:
+            return header_type
+        
+        # Inspect the first few kilobytes of content to determine type
+        if _HTML_SNIFF_RE.search(content_start, 0, SNIFF_SIZE):
+            return 'html'
         
-        return 'unknown'
+        # Check for Excel magic numbers
+        return _sniff_magic(content_start) or 'unknown'
     
-    def _get_filename_from_response(self, response: requests.Response, 
+    def _get_filename_from_response(self, response: requests.Response, content_start: bytes,
                                   city_code: str, town_code: str) -> str:
         """
         Extract filename from response headers or generate one with proper extension.
         
         Args:
             response: HTTP response object
+            content_start: First chunk of the response body
             city_code: City code for fallback filename
             town_code: Town code for fallback filename
             
@@ -422,8 +584,8 @@ class ElectionCrawler:
             Sanitized filename with appropriate extension
         """
         # Detect actual content type
-        content_type = self._detect_content_type(response)
-        self.logger.debug(f"Detected content type: {content_type}")
+        content_type = self._detect_content_type(response, content_start)
+        self.logger.debug("Detected content type: %s", content_type)
         
         base_filename = None
         
@@ -441,7 +603,7 @@ class ElectionCrawler:
                     base_filename = os.path.splitext(filename)[0]
                     
                 except Exception as e:
-                    self.logger.warning(f"Failed to parse filename from headers: {e}")
+                    self.logger.warning("Failed to parse filename from headers: %s", e)
         
         # Generate base filename if not extracted from headers
         if not base_filename:
@@ -451,25 +613,30 @@ class ElectionCrawler:
         # Add appropriate extension based on content type
         if content_type == 'html':
             filename = f"{base_filename}.html"
-            self.logger.info(f"Content detected as HTML, using extension: .html")
+            self.logger.info("Content detected as HTML, using extension: .html")
         elif content_type == 'excel':
             filename = f"{base_filename}.xls"
-            self.logger.info(f"Content detected as Excel, using extension: .xls")
+            self.logger.info("Content detected as Excel, using extension: .xls")
         else:
             # Default to .html since most responses seem to be HTML
             filename = f"{base_filename}.html"
-            self.logger.warning(f"Unknown content type, defaulting to .html extension")
+            self.logger.warning("Unknown content type, defaulting to .html extension")
         
-        self.logger.info(f"Final filename: {filename}")
+        self.logger.info("Final filename: %s", filename)
         return filename
     
-    def _validate_downloaded_content(self, filepath: Path, filename: str) -> bool:
+    def _validate_downloaded_content(self, filepath: Path, filename: str, content_start: bytes,
+                                     header_type: Optional[str] = None) -> bool:
         """
         Validate that the downloaded content is reasonable and matches expectations.
         
         Args:
             filepath: Path to the downloaded file
             filename: Name of the file for logging
+            content_start: First chunk of the downloaded content, kept from
+                streaming so the file does not have to be read back
+            header_type: Content type declared by the response header; when
+                set, only the size is checked and the content is not sniffed
             
         Returns:
             True if content is valid, False otherwise
@@ -477,61 +644,45 @@ class ElectionCrawler:
         try:
             # Check if file exists and has reasonable size
             if not filepath.exists():
-                self.logger.error(f"Downloaded file does not exist: {filename}")
+                self.logger.error("Downloaded file does not exist: %s", filename)
                 return False
             
             size = filepath.stat().st_size
             if size < 512:
-                self.logger.error(f"Downloaded file is too small ({size} bytes): {filename}")
+                self.logger.error("Downloaded file is too small (%s bytes): %s", size, filename)
                 return False
             
-            # Read first few KB to validate content
-            with open(filepath, 'rb') as f:
-                content_start = f.read(4096)
+            if header_type:
+                self.logger.debug("Content validation passed for: %s (%s per Content-Type)", filename, header_type)
+                return True
             
             # For HTML files, check for valid HTML structure
             if filename.lower().endswith('.html'):
-                try:
-                    content_text = content_start.decode('utf-8', errors='ignore').lower()
-                    
-                    # Check for basic HTML structure
-                    has_html_tags = any(tag in content_text for tag in ['<html', '<table', '<tr', '<td'])
-                    
-                    if not has_html_tags:
-                        self.logger.warning(f"HTML file doesn't contain expected HTML tags: {filename}")
-                        # Don't fail completely, as some files might be valid but different format
-                    
-                    # Check for error indicators
-                    error_indicators = ['error', 'exception', '404', '500', 'not found']
-                    if any(indicator in content_text for indicator in error_indicators):
-                        self.logger.warning(f"HTML file may contain error content: {filename}")
-                        
-                except UnicodeDecodeError:
-                    self.logger.warning(f"Could not decode HTML file as UTF-8: {filename}")
+                # Check for basic HTML structure
+                if not _HTML_TAG_RE.search(content_start):
+                    self.logger.warning("HTML file doesn't contain expected HTML tags: %s", filename)
+                    # Don't fail completely, as some files might be valid but different format
+                
+                # Check for error indicators
+                if _ERROR_RE.search(content_start):
+                    self.logger.warning("HTML file may contain error content: %s", filename)
             
             # For Excel files, check for valid Excel magic bytes
             elif filename.lower().endswith(('.xls', '.xlsx')):
                 # Check for Excel file signatures
-                is_ole2 = content_start.startswith(b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1')  # OLE2
-                is_zip = content_start.startswith(b'PK\x03\x04')  # ZIP (modern Excel)
-                
-                if not (is_ole2 or is_zip):
+                if not _sniff_magic(content_start):
                     # Might be HTML content with .xls extension
-                    try:
-                        content_text = content_start.decode('utf-8', errors='ignore').lower()
-                        if any(tag in content_text for tag in ['<html', '<table', '<tr']):
-                            self.logger.info(f"File with .xls extension contains HTML content: {filename}")
-                            # This is valid - server is returning HTML with .xls extension
-                        else:
-                            self.logger.warning(f"Excel file doesn't have expected file signature: {filename}")
-                    except UnicodeDecodeError:
-                        self.logger.warning(f"Could not validate Excel file content: {filename}")
-            
-            self.logger.debug(f"Content validation passed for: {filename}")
+                    if _HTML_TAG_RE.search(content_start):
+                        self.logger.info("File with .xls extension contains HTML content: %s", filename)
+                        # This is valid - server is returning HTML with .xls extension
+                    else:
+                        self.logger.warning("Excel file doesn't have expected file signature: %s", filename)
+            
+            self.logger.debug("Content validation passed for: %s", filename)
             return True
             
         except Exception as e:
-            self.logger.error(f"Error validating downloaded content for {filename}: {e}")
+            self.logger.error("Error validating downloaded content for %s: %s", filename, e)
             return False
     
     def crawl_all_locations(self, use_concurrent: bool = False, max_workers: int = MAX_WORKERS):
@@ -546,6 +697,7 @@ class ElectionCrawler:
         start_time = time.time()
         
         try:
+            self._load_existing_files()
             city_codes, _ = self.get_city_town_codes()
             
             if use_concurrent:
@@ -560,71 +712,86 @@ class ElectionCrawler:
         except KeyboardInterrupt:
             self.logger.info("Crawl interrupted by user")
         except Exception as e:
-            self.logger.error(f"Crawl failed: {e}")
+            self.logger.error("Crawl failed: %s", e)
             raise
     
     def _crawl_sequential(self, city_codes: List[LocationInfo]):
         """Crawl locations sequentially."""
         for i, city in enumerate(city_codes, 1):
-            self.logger.info(f"--- Processing city {i}/{len(city_codes)}: {city.name} ({city.code}) ---")
+            self.logger.info("--- Processing city %s/%s: %s (%s) ---", i, len(city_codes), city.name, city.code)
             
             town_codes = self.get_town_codes_for_city(city.code)
             if not town_codes:
-                self.logger.warning(f"No town codes found for {city.name}. Skipping.")
+                self.logger.warning("No town codes found for %s. Skipping.", city.name)
                 continue
             
+            # Requests are paced by the rate limiter rather than fixed sleeps
             for town in town_codes:
                 self.download_excel_for_location(city.code, city.name, town.code, town.name)
-                time.sleep(BASE_DELAY + random.uniform(-0.2, 0.2))  # Add jitter
-            
-            # Longer pause between cities
-            if i < len(city_codes):
-                time.sleep(CITY_DELAY)
     
     def _crawl_concurrent(self, city_codes: List[LocationInfo], max_workers: int):
         """Crawl locations with concurrent downloads."""
-        self.logger.info(f"Using concurrent downloads with {max_workers} workers")
-        
-        # Prepare all download tasks
-        download_tasks = []
-        for city in city_codes:
-            town_codes = self.get_town_codes_for_city(city.code)
-            for town in town_codes:
-                download_tasks.append((city.code, city.name, town.code, town.name))
-        
-        self.logger.info(f"Total download tasks: {len(download_tasks)}")
-        
-        # Execute downloads concurrently
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_to_task = {
-                executor.submit(self.download_excel_for_location, *task): task 
-                for task in download_tasks
-            }
+        self.logger.info("Using concurrent downloads with %s workers", max_workers)
+        
+        # Shared by all worker threads; each worker gets the request rate
+        # that BASE_DELAY gives a sequential crawl
+        self.rate_limiter = RateLimiter(max_workers / BASE_DELAY)
+        
+        if max_workers > self.max_workers:
+            # Mount adapters sized for the larger pool and close the replaced
+            # ones so their pooled connections are released
+            self.max_workers = max_workers
+            old_adapters = set(self.session.adapters.values())
+            self._setup_session()
+            for adapter in old_adapters:
+                adapter.close()
+        
+        # Look up town codes for all cities in parallel (capped at max_workers
+        # to stay polite) and submit each city's downloads as soon as its
+        # town codes arrive, so the download pool fills immediately
+        lookup_workers = max(1, min(max_workers, len(city_codes)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor, \
+                ThreadPoolExecutor(max_workers=lookup_workers) as lookup_executor:
+            town_lists = lookup_executor.map(self.get_town_codes_for_city,
+                                             [city.code for city in city_codes])
+            future_to_task = {}
+            for city, town_codes in zip(city_codes, town_lists):
+                for town in town_codes:
+                    task = (city.code, city.name, town.code, town.name)
+                    future_to_task[executor.submit(self.download_excel_for_location, *task)] = task
+            
+            self.logger.info("Total download tasks: %s", len(future_to_task))
             
             for future in as_completed(future_to_task):
                 task = future_to_task[future]
                 try:
                     future.result()
                 except Exception as e:
-                    self.logger.error(f"Download task failed for {task}: {e}")
+                    self.logger.error("Download task failed for %s: %s", task, e)
     
     def _print_final_stats(self, elapsed_time: float):
         """Print final crawling statistics."""
         total_files = self.stats['downloaded'] + self.stats['errors'] + self.stats['skipped']
         
-        self.logger.info("=" * 50)
-        self.logger.info("CRAWL COMPLETED")
-        self.logger.info("=" * 50)
-        self.logger.info(f"Total files processed: {total_files}")
-        self.logger.info(f"Successfully downloaded: {self.stats['downloaded']}")
-        self.logger.info(f"Skipped (already exists): {self.stats['skipped']}")
-        self.logger.info(f"Errors: {self.stats['errors']}")
-        self.logger.info(f"Total download size: {self.stats['total_size']:,} bytes")
-        self.logger.info(f"Elapsed time: {elapsed_time:.2f} seconds")
+        # Emit the whole summary as one record: one lock and one handler
+        # dispatch instead of one per line
+        lines = [
+            _BANNER,
+            "CRAWL COMPLETED",
+            _BANNER,
+            f"Total files processed: {total_files}",
+            f"Successfully downloaded: {self.stats['downloaded']}",
+            f"Skipped (already exists): {self.stats['skipped']}",
+            f"Errors: {self.stats['errors']}",
+            f"Total download size: {self.stats['total_size']:,} bytes",
+            f"Elapsed time: {elapsed_time:.2f} seconds",
+        ]
         if self.stats['downloaded'] > 0:
             avg_time = elapsed_time / self.stats['downloaded']
-            self.logger.info(f"Average time per download: {avg_time:.2f} seconds")
-        self.logger.info("=" * 50)
+            lines.append(f"Average time per download: {avg_time:.2f} seconds")
+        lines.append(_BANNER)
+        
+        self.logger.info("%s", "\n".join(lines))
 
 
 def main():
@@ -655,7 +822,8 @@ def main():
     crawler = ElectionCrawler(
         election_id=args.election_id,
         election_code=args.election_code,
-        download_dir=args.download_dir
+        download_dir=args.download_dir,
+        max_workers=args.max_workers
     )
     
     try:
@@ -7,97 +7,174 @@ and converts them to clean CSV format for easier data analysis.
 
 import os
 import pandas as pd
-from bs4 import BeautifulSoup
+import pyarrow as pa
+import pyarrow.csv as pacsv
+from lxml import etree, html as lhtml
 import csv
 from pathlib import Path
+from types import MappingProxyType
 import argparse
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Iterator, Tuple
 import re
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+# Set up logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+# Runs of whitespace (including line breaks) collapsed by _clean_text
+_WS_RE = re.compile(r'\s+')
+
+# Thousands separators and spaces stripped from counts by _safe_int; counts
+# are whole numbers, so plain integers skip the float() round trip
+_STRIP_TABLE = str.maketrans('', '', ', ')
+_INT_RE = re.compile(r'-?\d+')
+
+# Report files are UTF-8; pin the encoding so pages without a charset meta
+# tag are not decoded with libxml2's Latin-1 default. Comments and processing
+# instructions are never read, so don't build nodes for them.
+_HTML_PARSER = lhtml.HTMLParser(encoding='utf-8', remove_comments=True, remove_pis=True)
+
+# Lookups for the results table, compiled once; the id is preferred over
+# the class
+_TABLE_BY_ID = etree.XPath('//table[@id="table01"]')
+_TABLE_BY_CLASS = etree.XPath('//table[contains(concat(" ", normalize-space(@class), " "), " table01 ")]')
+
+# City names for the summary, by city code (you can expand this); read-only
+# since it is shared by every call
+_CITY_MAP = MappingProxyType({
+    '1100': '서울특별시',
+    '2600': '부산광역시',
+    '2700': '대구광역시'
+})
+
+# Per-process parser used by _process_one, created by _init_worker
+_worker_parser = None
+
+
+def _cell_text(cell) -> str:
+    """
+    Return the text of a table cell.
+    
+    Most cells hold a single text node, which .text gives directly;
+    text_content() runs an XPath string() query and is only needed when
+    the cell has child elements.
+    """
+    if len(cell):
+        return cell.text_content()
+    return cell.text or ''
+
+
+def _init_worker(input_dir: str, output_dir: str):
+    """Create the parser instance used by a worker process."""
+    global _worker_parser
+    _worker_parser = ElectionHTMLParser(input_dir, output_dir)
+
+
+def _process_one(html_file: Path) -> Tuple[int, Optional[Dict[str, Any]]]:
+    """
+    Convert a single HTML file to CSV in a worker process.
+    
+    Args:
+        html_file: Path to HTML file
+        
+    Returns:
+        Tuple of the number of data rows saved (0 if the file failed or had
+        no data) and the file's summary record, if it has a 합계 row
+    """
+    return _worker_parser.process_file(html_file)
 
 
 class ElectionHTMLParser:
     """Parser for Korean election results HTML files."""
     
-    def __init__(self, input_dir: str = "election_results", output_dir: str = "csv_results"):
+    def __init__(self, input_dir: str = "election_results", output_dir: str = "csv_results",
+                 max_workers: Optional[int] = None):
         """
         Initialize the parser.
         
         Args:
             input_dir: Directory containing HTML files
             output_dir: Directory to save CSV files
+            max_workers: Number of worker processes (defaults to the CPU count)
         """
         self.input_dir = Path(input_dir)
         self.output_dir = Path(output_dir)
+        self.max_workers = max_workers
         self.output_dir.mkdir(exist_ok=True)
+        # Summary records collected by parse_all_files for create_summary_csv
+        self.summary_data: List[Dict[str, Any]] = []
     
-    def parse_html_file(self, html_file: Path) -> List[Dict[str, Any]]:
+    def parse_html_file(self, html_file: Path) -> Tuple[List[str], List[list]]:
         """
-        Parse a single HTML file and extract table data.
+        Parse a single HTML file and locate its table data.
         
         Args:
             html_file: Path to HTML file
             
         Returns:
-            List of dictionaries containing row data
+            Tuple of header names and the cell elements of each data row
         """
-        print(f"Parsing: {html_file.name}")
+        logger.debug("Parsing: %s", html_file.name)
         
-        with open(html_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        soup = BeautifulSoup(content, 'html.parser')
+        # Let libxml2 read the file itself instead of building a str first
+        tree = lhtml.parse(str(html_file), parser=_HTML_PARSER).getroot()
         
         # Find the main data table
-        table = soup.find('table', {'id': 'table01'}) or soup.find('table', class_='table01')
+        tables = _TABLE_BY_ID(tree) or _TABLE_BY_CLASS(tree)
         
-        if not table:
-            print(f"Warning: No data table found in {html_file.name}")
-            return []
+        if not tables:
+            logger.warning("No data table found in %s", html_file.name)
+            return [], []
+        table = tables[0]
         
         # Extract headers
         headers = self._extract_headers(table)
-        print(f"Found {len(headers)} columns: {headers[:5]}...")  # Show first 5 headers
+        logger.debug("Found %d columns: %s...", len(headers), headers[:5])  # Show first 5 headers
         
-        # Extract data rows
-        data_rows = self._extract_data_rows(table, headers)
-        print(f"Extracted {len(data_rows)} data rows")
+        # Locate data rows; their text is extracted while writing
+        cell_rows = self._find_data_rows(table)
+        logger.debug("Found %d data rows", len(cell_rows))
         
-        return data_rows
+        return headers, cell_rows
     
     def _extract_headers(self, table) -> List[str]:
         """Extract and clean table headers."""
         headers = []
         
         # Find header rows (usually in thead)
-        thead = table.find('thead')
+        thead = table.xpath('.//thead')
         if thead:
-            header_rows = thead.find_all('tr')
+            header_rows = thead[0].xpath('.//tr')
         else:
             # Fallback: look for first few rows with th elements
-            header_rows = table.find_all('tr')[:2]
+            header_rows = table.xpath('.//tr')[:2]
         
         # Process header rows to handle rowspan/colspan
         if len(header_rows) >= 2:
             # Two-row header structure
-            first_row = header_rows[0].find_all(['th', 'td'])
-            second_row = header_rows[1].find_all(['th', 'td'])
+            first_row = header_rows[0].xpath('.//th|.//td')
+            second_row = header_rows[1].xpath('.//th|.//td')
             
             headers = []
             for cell in first_row:
-                text = self._clean_text(cell.get_text())
-                colspan = int(cell.get('colspan', 1))
-                rowspan = int(cell.get('rowspan', 1))
+                text = self._clean_text(_cell_text(cell))
+                attrib = cell.attrib
                 
-                if rowspan == 2:
+                if int(attrib.get('rowspan', 1)) == 2:
                     # Cell spans both rows
                     headers.append(text)
                 else:
                     # Cell only in first row, get subcells from second row
                     if text == "후보자별 득표수":
-                        # Special handling for candidate columns
+                        # Special handling for candidate columns; colspan is
+                        # only needed here
+                        colspan = int(attrib.get('colspan', 1))
                         candidate_cells = second_row[:colspan]
                         for candidate_cell in candidate_cells:
-                            candidate_text = self._clean_text(candidate_cell.get_text())
+                            candidate_text = self._clean_text(_cell_text(candidate_cell))
                             headers.append(candidate_text)
                         # Remove processed cells from second_row
                         second_row = second_row[colspan:]
@@ -106,85 +183,97 @@ class ElectionHTMLParser:
             
             # Add remaining cells from second row
             for cell in second_row:
-                text = self._clean_text(cell.get_text())
+                text = self._clean_text(_cell_text(cell))
                 headers.append(text)
         else:
             # Single row header
-            header_cells = header_rows[0].find_all(['th', 'td'])
-            headers = [self._clean_text(cell.get_text()) for cell in header_cells]
+            header_cells = header_rows[0].xpath('.//th|.//td')
+            headers = [self._clean_text(_cell_text(cell)) for cell in header_cells]
         
         return headers
     
-    def _extract_data_rows(self, table, headers: List[str]) -> List[Dict[str, Any]]:
-        """Extract data rows from table."""
-        tbody = table.find('tbody')
+    def _find_data_rows(self, table) -> List[list]:
+        """Return the cell elements of each non-empty data row."""
+        tbody = table.xpath('.//tbody')
         if tbody:
-            rows = tbody.find_all('tr')
+            rows = tbody[0].xpath('.//tr')
         else:
             # Skip header rows
-            all_rows = table.find_all('tr')
+            all_rows = table.xpath('.//tr')
             rows = all_rows[2:] if len(all_rows) > 2 else all_rows[1:]
         
-        data_rows = []
+        cell_rows = []
         
         for row in rows:
-            cells = row.find_all(['td', 'th'])
-            if len(cells) == 0:
+            # Spacer rows have no child elements; skip them before any lookup
+            if not len(row):
                 continue
-            
-            row_data = {}
-            
-            # Map cells to headers
-            for i, cell in enumerate(cells):
-                if i < len(headers):
-                    cell_text = self._clean_text(cell.get_text())
-                    row_data[headers[i]] = cell_text
-                else:
-                    # Extra cells (shouldn't happen with proper headers)
-                    row_data[f'Extra_Column_{i}'] = self._clean_text(cell.get_text())
-            
-            # Fill missing columns with empty values
-            for header in headers:
-                if header not in row_data:
-                    row_data[header] = ''
-            
-            data_rows.append(row_data)
+            cells = list(row.iter('td', 'th'))
+            if cells:
+                cell_rows.append(cells)
         
-        return data_rows
+        return cell_rows
     
-    def _clean_text(self, text: str) -> str:
+    @staticmethod
+    def _output_columns(headers: List[str], cell_rows: List[list]) -> List[str]:
+        """Return the sorted CSV columns, including Extra_Column_N for surplus cells."""
+        widest = max(map(len, cell_rows), default=0)
+        return sorted(set(headers).union(f'Extra_Column_{i}' for i in range(len(headers), widest)))
+    
+    def _extract_data_rows(self, cell_rows: List[list], headers: List[str],
+                           columns: List[str]) -> Iterator[List[str]]:
+        """
+        Yield each data row as a list of cell texts in column order.
+        
+        Args:
+            cell_rows: Cell elements of each data row
+            headers: Header names, by cell position
+            columns: Output column order from _output_columns
+        """
+        # Output slot for each cell position; a repeated header name keeps the
+        # value of its last cell
+        position = {column: i for i, column in enumerate(columns)}
+        slots = [position[header] for header in headers]
+        while f'Extra_Column_{len(slots)}' in position:
+            slots.append(position[f'Extra_Column_{len(slots)}'])
+        
+        # Per-table invariants, hoisted out of the per-cell loop
+        n_columns = len(columns)
+        clean = self._clean_text
+        
+        for cells in cell_rows:
+            # Start with every column empty; cells overwrite their slots
+            row = [''] * n_columns
+            for slot, cell in zip(slots, cells):
+                row[slot] = clean(_cell_text(cell))
+            yield row
+    
+    @staticmethod
+    def _tap_summary_row(columns: List[str], rows: Iterator[List[str]],
+                         summary_row: Dict[str, str]) -> Iterator[List[str]]:
+        """Pass rows through, copying the first 합계 row into summary_row."""
+        for row in rows:
+            if not summary_row and row[0] == '합계':
+                summary_row.update(zip(columns, row))
+            yield row
+    
+    @staticmethod
+    def _clean_text(text: str) -> str:
         """Clean and normalize text."""
         if not text:
             return ''
         
-        # Remove extra whitespace and line breaks
-        text = re.sub(r'\s+', ' ', text.strip())
-        
-        # Remove common HTML artifacts
-        text = text.replace('\n', ' ').replace('\r', ' ')
-        
-        return text
+        # Collapse extra whitespace and line breaks
+        return _WS_RE.sub(' ', text.strip())
     
-    def save_to_csv(self, data_rows: List[Dict[str, Any]], output_file: Path):
-        """Save data to CSV file."""
-        if not data_rows:
-            print(f"No data to save for {output_file}")
-            return
-        
-        # Get all unique headers from all rows
-        all_headers = set()
-        for row in data_rows:
-            all_headers.update(row.keys())
-        
-        # Sort headers for consistent column order
-        headers = sorted(list(all_headers))
-        
+    def save_to_csv(self, columns: List[str], rows: Iterator[List[str]], output_file: Path):
+        """Stream positional rows to a CSV file under the given columns."""
         with open(output_file, 'w', newline='', encoding='utf-8-sig') as f:
-            writer = csv.DictWriter(f, fieldnames=headers)
-            writer.writeheader()
-            writer.writerows(data_rows)
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(rows)
         
-        print(f"Saved CSV: {output_file} ({len(data_rows)} rows, {len(headers)} columns)")
+        logger.debug("Saved CSV: %s (%d columns)", output_file, len(columns))
     
     def parse_all_files(self) -> Dict[str, int]:
         """
@@ -196,82 +285,134 @@ class ElectionHTMLParser:
         html_files = list(self.input_dir.glob("*.xls")) + list(self.input_dir.glob("*.html"))
         
         if not html_files:
-            print(f"No HTML files found in {self.input_dir}")
+            logger.warning("No HTML files found in %s", self.input_dir)
             return {'processed': 0, 'errors': 0}
         
         stats = {'processed': 0, 'errors': 0, 'total_rows': 0}
-        
-        for html_file in html_files:
-            try:
-                # Parse HTML file
-                data_rows = self.parse_html_file(html_file)
-                
-                if data_rows:
-                    # Generate output filename
-                    csv_filename = html_file.stem + '.csv'
-                    output_file = self.output_dir / csv_filename
-                    
-                    # Save to CSV
-                    self.save_to_csv(data_rows, output_file)
-                    
+        self.summary_data = []
+        
+        # Files are independent and parsing is CPU-bound, so spread them
+        # over worker processes
+        with ProcessPoolExecutor(max_workers=self.max_workers, initializer=_init_worker,
+                                 initargs=(str(self.input_dir), str(self.output_dir))) as executor:
+            for row_count, summary in executor.map(_process_one, html_files, chunksize=4):
+                if summary is not None:
+                    self.summary_data.append(summary)
+                if row_count:
                     stats['processed'] += 1
-                    stats['total_rows'] += len(data_rows)
+                    stats['total_rows'] += row_count
                 else:
-                    print(f"No data extracted from {html_file.name}")
                     stats['errors'] += 1
-                    
-            except Exception as e:
-                print(f"Error processing {html_file.name}: {e}")
-                stats['errors'] += 1
         
         return stats
     
+    def process_file(self, html_file: Path) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """
+        Parse a single HTML file and save its data as CSV.
+        
+        Args:
+            html_file: Path to HTML file
+            
+        Returns:
+            Tuple of the number of data rows saved (0 if the file failed or had
+            no data) and the file's summary record, if it has a 합계 row
+        """
+        try:
+            # Parse HTML file
+            headers, cell_rows = self.parse_html_file(html_file)
+            
+            if cell_rows:
+                # Generate output filename
+                csv_filename = html_file.stem + '.csv'
+                output_file = self.output_dir / csv_filename
+                
+                # Stream rows to CSV without building them all first, keeping
+                # the 합계 row for the summary on the way through
+                columns = self._output_columns(headers, cell_rows)
+                rows = self._extract_data_rows(cell_rows, headers, columns)
+                summary_row = {}
+                self.save_to_csv(columns, self._tap_summary_row(columns, rows, summary_row),
+                                 output_file)
+                
+                summary = self._summary_record(output_file, summary_row) if summary_row else None
+                return len(cell_rows), summary
+            else:
+                logger.warning("No data extracted from %s", html_file.name)
+                return 0, None
+                
+        except Exception as e:
+            logger.error("Error processing %s: %s", html_file.name, e)
+            return 0, None
+    
     def create_summary_csv(self):
-        """Create a summary CSV combining key data from all files."""
-        csv_files = list(self.output_dir.glob("*.csv"))
+        """
+        Create a summary CSV from the 합계 rows collected by parse_all_files.
         
-        if not csv_files:
-            print("No CSV files found to create summary")
+        When nothing was collected (no parse_all_files run on this instance),
+        the rows are read back from the CSV files in the output directory.
+        """
+        summary_data = self.summary_data or self._summary_from_csv_files()
+        if not summary_data:
+            logger.warning("No summary rows found to create summary")
             return
         
+        summary_file = self.output_dir / "election_summary.csv"
+        table = pa.Table.from_pylist(summary_data)
+        with open(summary_file, 'wb') as f:
+            # Keep the BOM so Excel detects UTF-8 for the Korean names
+            f.write('\ufeff'.encode('utf-8'))
+            pacsv.write_csv(table, f)
+        logger.info("Created summary file: %s", summary_file)
+    
+    def _summary_from_csv_files(self) -> List[Dict[str, Any]]:
+        """Build summary records from the 합계 rows of the CSV files on disk."""
+        csv_files = [csv_file for csv_file in self.output_dir.glob("*.csv")
+                     if csv_file.name != "election_summary.csv"]
+        
+        if not csv_files:
+            logger.warning("No CSV files found to create summary")
+            return []
+        
         summary_data = []
         
         for csv_file in csv_files:
             try:
-                df = pd.read_csv(csv_file)
-                
-                # Extract location info from filename or first rows
-                location_info = self._extract_location_info(csv_file, df)
+                # Find the summary row (합계) in the first column, reading
+                # only as far as that row
+                with open(csv_file, newline='', encoding='utf-8-sig') as f:
+                    reader = csv.DictReader(f)
+                    first_column = reader.fieldnames[0] if reader.fieldnames else None
+                    summary_row = next((row for row in reader if row[first_column] == '합계'), None)
                 
-                # Get summary statistics
-                if not df.empty and '합계' in df.iloc[:, 0].values:
-                    # Find the summary row (합계)
-                    summary_row = df[df.iloc[:, 0] == '합계'].iloc[0]
-                    
-                    summary_data.append({
-                        'File': csv_file.name,
-                        'City': location_info.get('city', ''),
-                        'District': location_info.get('district', ''),
-                        'Total_Eligible_Voters': self._safe_int(summary_row.get('선거인수', 0)),
-                        'Total_Votes_Cast': self._safe_int(summary_row.get('투표수', 0)),
-                        'Invalid_Votes': self._safe_int(summary_row.get('무효 투표수', 0)),
-                        'Abstentions': self._safe_int(summary_row.get('기권자수', 0)),
-                        'Voter_Turnout_Pct': self._calculate_turnout(
-                            summary_row.get('선거인수', 0), 
-                            summary_row.get('투표수', 0)
-                        )
-                    })
+                if summary_row is not None:
+                    summary_data.append(self._summary_record(csv_file, summary_row))
                     
             except Exception as e:
-                print(f"Error processing {csv_file.name} for summary: {e}")
+                logger.error("Error processing %s for summary: %s", csv_file.name, e)
         
-        if summary_data:
-            summary_file = self.output_dir / "election_summary.csv"
-            pd.DataFrame(summary_data).to_csv(summary_file, index=False, encoding='utf-8-sig')
-            print(f"Created summary file: {summary_file}")
+        return summary_data
+    
+    def _summary_record(self, csv_file: Path, summary_row: Dict[str, str]) -> Dict[str, Any]:
+        """Build the summary record for a CSV file from its 합계 row."""
+        # Extract location info from filename
+        location_info = self._extract_location_info(csv_file)
+        
+        return {
+            'File': csv_file.name,
+            'City': location_info.get('city', ''),
+            'District': location_info.get('district', ''),
+            'Total_Eligible_Voters': self._safe_int(summary_row.get('선거인수', 0)),
+            'Total_Votes_Cast': self._safe_int(summary_row.get('투표수', 0)),
+            'Invalid_Votes': self._safe_int(summary_row.get('무효 투표수', 0)),
+            'Abstentions': self._safe_int(summary_row.get('기권자수', 0)),
+            'Voter_Turnout_Pct': self._calculate_turnout(
+                summary_row.get('선거인수', 0), 
+                summary_row.get('투표수', 0)
+            )
+        }
     
-    def _extract_location_info(self, csv_file: Path, df: pd.DataFrame) -> Dict[str, str]:
-        """Extract location information from filename or data."""
+    def _extract_location_info(self, csv_file: Path) -> Dict[str, str]:
+        """Extract location information from filename."""
         # Try to extract from filename pattern
         filename = csv_file.stem
         
@@ -281,15 +422,8 @@ class ElectionHTMLParser:
             city_code = parts[2]
             district_code = parts[3]
             
-            # Map codes to names (you can expand this)
-            city_map = {
-                '1100': '서울특별시',
-                '2600': '부산광역시',
-                '2700': '대구광역시'
-            }
-            
             return {
-                'city': city_map.get(city_code, city_code),
+                'city': _CITY_MAP.get(city_code, city_code),
                 'district': district_code  # Could map district codes too
             }
         
@@ -303,7 +437,9 @@ class ElectionHTMLParser:
         try:
             # Remove commas and convert
             if isinstance(value, str):
-                value = value.replace(',', '').replace(' ', '')
+                value = value.translate(_STRIP_TABLE)
+                if _INT_RE.fullmatch(value):
+                    return int(value)
             return int(float(value))
         except (ValueError, TypeError):
             return 0
@@ -327,11 +463,17 @@ def main():
                        help='Directory to save CSV files')
     parser.add_argument('--create-summary', action='store_true',
                        help='Create summary CSV file')
+    parser.add_argument('--max-workers', type=int, default=None,
+                       help='Number of worker processes (default: CPU count)')
+    parser.add_argument('--log-level', default='INFO',
+                       choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                       help='Logging level (DEBUG shows per-file progress)')
     
     args = parser.parse_args()
+    logging.getLogger().setLevel(args.log_level)
     
     # Create parser instance
-    html_parser = ElectionHTMLParser(args.input_dir, args.output_dir)
+    html_parser = ElectionHTMLParser(args.input_dir, args.output_dir, args.max_workers)
     
     print("HTML to CSV Election Results Parser")
     print("=" * 40)